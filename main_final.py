@@ -1,13 +1,29 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response as RawResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, Deque
 from uuid import UUID, uuid4
 from datetime import datetime
+from dataclasses import dataclass, asdict
 from decimal import Decimal
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+from collections import deque
+import asyncio
+import atexit
+import base64
 import hashlib
+import hmac
+import logging
+import logging.handlers
+import os
+import queue
 import random
+import secrets
+import time
+import orjson
 
 # ============================================================
 # CONFIGURACIÓN GENERAL - VIÑA URBANA
@@ -15,6 +31,24 @@ import random
 
 API_PREFIX = "/api/vinaurbana"
 
+logger = logging.getLogger("vinaurbana")
+
+# Los logs pasan por una cola y los escribe un hilo aparte, para que un
+# request con logging activo no quede esperando el write() a stdout.
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Generador propio para los datos simulados (tracking, métricas, demanda)
+_rng = random.Random()
+
+# Clave para firmar los tokens; en prod definir VINAURBANA_SECRET_KEY
+SECRET_KEY = os.environ.get("VINAURBANA_SECRET_KEY") or secrets.token_hex(32)
+ACCESS_TOKEN_EXPIRE_SECONDS = 15 * 60
+
 app = FastAPI(
     title="API Viña Urbana",
     description="Plataforma boutique de vinos - Proyecto Viña Urbana",
@@ -42,6 +76,17 @@ class Response(BaseModel):
     data: Optional[dict | list] = None
 
 
+# Los GET de solo lectura devuelven el mismo formato que Response, pero sin
+# validarlo a la salida; Response queda en `responses` para el OpenAPI.
+DOC_RESPONSE = {200: {"model": Response}}
+
+
+def _respuesta_json(message: str = "OK", data: Optional[dict | list] = None) -> RawResponse:
+    # orjson directo a bytes: sin ORJSONResponse (deprecada en FastAPI) ni jsonable_encoder
+    body = orjson.dumps({"statusCode": 200, "message": message, "data": data})
+    return RawResponse(content=body, media_type="application/json")
+
+
 # --- Autenticación / Usuarios ---
 
 class User(BaseModel):
@@ -71,6 +116,8 @@ class TokenResponse(BaseModel):
 
 # --- Catálogo / Productos usados por los HTML ---
 
+# Esquemas Pydantic de los endpoints (documentación / validación de entrada)
+
 class Producto(BaseModel):
     id: str
     nombre: str
@@ -105,51 +152,153 @@ class Tienda(BaseModel):
     maps_url: Optional[str] = None
 
 
+# Envoltorios tipados solo para el OpenAPI: mismo formato que Response, con
+# `data` descrito por el esquema que corresponde a cada GET del catálogo.
+
+class RespuestaProducto(Response):
+    data: Optional[Producto] = None
+
+
+class RespuestaProductos(Response):
+    data: List[Producto] = Field(default_factory=list)
+
+
+class RespuestaOfertas(Response):
+    data: List[Oferta] = Field(default_factory=list)
+
+
+class RespuestaTiendas(Response):
+    data: List[Tienda] = Field(default_factory=list)
+
+
+# Registros internos de solo lectura: dataclasses con __slots__, mucho más
+# livianos que un BaseModel para datos fijos que nunca se validan.
+
+@dataclass(frozen=True, slots=True)
+class ProductoRec:
+    id: str
+    nombre: str
+    tipo: str
+    cepa: str
+    origen: str
+    precio: int
+    imagen: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class OfertaRec:
+    id: str
+    producto_id: str
+    nombre: str
+    tipo: str
+    precio: int
+    original: int
+    descuento: int
+    club_only: bool = False
+    imagen: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class TiendaRec:
+    id: str
+    comuna: str
+    nombre: str
+    direccion: str
+    horario: str
+    telefono: str
+    servicios: Tuple[str, ...]
+    imagen: Optional[str] = None
+    maps_url: Optional[str] = None
+
+
 # ============================================================
-# FUNCIONES DE SEGURIDAD (SIN JWT, TOKEN SIMPLE)
+# FUNCIONES DE SEGURIDAD (SIN JWT, TOKEN FIRMADO CON BLAKE2)
 # ============================================================
 
 def hashear_contraseña(password: str) -> str:
     """Hash simple para evitar problemas con bcrypt/passlib en tu entorno."""
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    return hashlib.blake2b(password.encode("utf-8"), digest_size=32).hexdigest()
+
+
+# Cachear los hashes deja contraseñas en memoria del proceso: solo si se activa
+if os.environ.get("VINAURBANA_CACHE_HASHES") == "1":
+    hashear_contraseña = lru_cache(maxsize=4096)(hashear_contraseña)
 
 
 def verificar_contraseña(plain: str, hashed: str) -> bool:
-    return hashear_contraseña(plain) == hashed
+    return hmac.compare_digest(hashear_contraseña(plain), hashed)
+
+
+# BLAKE2b admite clave (máx. 64 bytes): se deriva una vez desde SECRET_KEY
+_TOKEN_KEY = hashlib.blake2b(SECRET_KEY.encode("utf-8")).digest()
+
+
+def _firmar(payload: bytes) -> str:
+    firma = hashlib.blake2b(payload, key=_TOKEN_KEY, digest_size=32).digest()
+    return base64.urlsafe_b64encode(firma).rstrip(b"=").decode("ascii")
 
 
 def crear_token(data: dict) -> str:
     """
     NO usamos JWT porque jose da error en tu PC.
-    Devolvemos un token simple: 'token-<email>'
+    Devolvemos un token firmado con BLAKE2b en modo keyed (stdlib):
+    '<base64(email|expiracion)>.<firma>'
     """
     sub = data.get("sub")
     if not sub:
         raise ValueError("El payload del token debe incluir 'sub' con el email del usuario")
-    return f"token-{sub}"
+    exp = int(time.time()) + ACCESS_TOKEN_EXPIRE_SECONDS
+    payload = base64.urlsafe_b64encode(f"{sub}|{exp}".encode("utf-8")).rstrip(b"=")
+    return f"{payload.decode('ascii')}.{_firmar(payload)}"
+
+
+@lru_cache(maxsize=1024)
+def _verificar_token(token: str) -> Optional[tuple]:
+    """Valida la firma y devuelve (email, expiracion); None si el token es inválido.
+
+    Se cachea para que un mismo bearer repetido no vuelva a calcular la firma.
+    La expiración se revisa en cada request en get_current_user.
+    """
+    payload, sep, firma = token.partition(".")
+    # compare_digest sobre str solo acepta ASCII: una firma con otros caracteres
+    # (Starlette decodifica headers como latin-1) es inválida sin comparar
+    if not sep or not firma.isascii():
+        return None
+    if not hmac.compare_digest(firma, _firmar(payload.encode("ascii", "ignore"))):
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode("utf-8")
+        email, exp = raw.rsplit("|", 1)
+        return email, int(exp)
+    except ValueError:
+        return None
 
 
 # ============================================================
 # "BASES DE DATOS" EN MEMORIA
 # ============================================================
 
-db_users: List[User] = []
-db_membresias: List[dict] = []
-db_notificaciones: List[dict] = []
-db_stock: List[dict] = []
-db_pedidos: List["Pedido"] = []
-db_tickets: List[dict] = []
-db_marketplace: List[dict] = []
-db_alianzas: List[dict] = []
+# Los registros de solo escritura se guardan en buffers acotados: al llegar
+# al máximo se descartan los más antiguos en vez de crecer sin límite.
+MAX_REGISTROS = 100_000
+
+db_users_by_email: Dict[str, User] = {}  # clave: email en minúsculas
+db_membresias: Deque[dict] = deque(maxlen=MAX_REGISTROS)
+db_notificaciones: Deque[dict] = deque(maxlen=MAX_REGISTROS)
+db_stock: Dict[str, dict] = {}  # clave: nombre en minúsculas
+db_pedidos: Dict[UUID, "Pedido"] = {}
+db_tickets: Deque[dict] = deque(maxlen=MAX_REGISTROS)
+db_marketplace: Deque[dict] = deque(maxlen=MAX_REGISTROS)
+db_alianzas: Deque[dict] = deque(maxlen=MAX_REGISTROS)
 db_etiquetas: List["EtiquetaDigital"] = []
-db_donaciones: List[dict] = []
-db_visitas: List["VisitaVirtual"] = []
-db_maridajes: List["MaridajeInteractivo"] = []
+db_donaciones: Deque[dict] = deque(maxlen=MAX_REGISTROS)
+db_visitas: Deque["VisitaVirtual"] = deque(maxlen=MAX_REGISTROS)
+db_maridajes: Deque["MaridajeInteractivo"] = deque(maxlen=MAX_REGISTROS)
 
 # Catálogo principal alineado con los HTML (p01–p12 + rosados + espumantes)
-CATALOGO: List[Producto] = [
+CATALOGO: Tuple[ProductoRec, ...] = (
     # Reserva Especial tintos / blancos (p01–p12)
-    Producto(
+    ProductoRec(
         id="p01",
         nombre="Reserva Especial 2016",
         tipo="tinto",
@@ -158,7 +307,7 @@ CATALOGO: List[Producto] = [
         precio=9690,
         imagen="https://images.pexels.com/photos/2149147/pexels-photo-2149147.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p02",
         nombre="Reserva Especial 2017",
         tipo="blanco",
@@ -167,7 +316,7 @@ CATALOGO: List[Producto] = [
         precio=10390,
         imagen="https://images.pexels.com/photos/2149164/pexels-photo-2149164.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p03",
         nombre="Reserva Especial 2018",
         tipo="tinto",
@@ -176,7 +325,7 @@ CATALOGO: List[Producto] = [
         precio=11090,
         imagen="https://images.pexels.com/photos/2149151/pexels-photo-2149151.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p04",
         nombre="Reserva Especial 2019",
         tipo="blanco",
@@ -185,7 +334,7 @@ CATALOGO: List[Producto] = [
         precio=11790,
         imagen="https://images.pexels.com/photos/1407850/pexels-photo-1407850.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p05",
         nombre="Reserva Especial 2020",
         tipo="tinto",
@@ -194,7 +343,7 @@ CATALOGO: List[Producto] = [
         precio=12490,
         imagen="https://images.pexels.com/photos/2149161/pexels-photo-2149161.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p06",
         nombre="Reserva Especial 2021",
         tipo="blanco",
@@ -203,7 +352,7 @@ CATALOGO: List[Producto] = [
         precio=13190,
         imagen="https://images.pexels.com/photos/5531554/pexels-photo-5531554.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p07",
         nombre="Reserva Especial 2022",
         tipo="tinto",
@@ -212,7 +361,7 @@ CATALOGO: List[Producto] = [
         precio=13890,
         imagen="https://images.pexels.com/photos/2149148/pexels-photo-2149148.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p08",
         nombre="Reserva Especial 2023",
         tipo="blanco",
@@ -221,7 +370,7 @@ CATALOGO: List[Producto] = [
         precio=14590,
         imagen="https://images.pexels.com/photos/1407855/pexels-photo-1407855.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p09",
         nombre="Reserva Especial 2024",
         tipo="tinto",
@@ -230,7 +379,7 @@ CATALOGO: List[Producto] = [
         precio=15290,
         imagen="https://images.pexels.com/photos/1407857/pexels-photo-1407857.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p10",
         nombre="Reserva Especial 2025",
         tipo="blanco",
@@ -239,7 +388,7 @@ CATALOGO: List[Producto] = [
         precio=15990,
         imagen="https://images.pexels.com/photos/2149144/pexels-photo-2149144.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p11",
         nombre="Reserva Especial 2026",
         tipo="tinto",
@@ -248,7 +397,7 @@ CATALOGO: List[Producto] = [
         precio=16690,
         imagen="https://images.pexels.com/photos/2149146/pexels-photo-2149146.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="p12",
         nombre="Reserva Especial 2027",
         tipo="blanco",
@@ -258,7 +407,7 @@ CATALOGO: List[Producto] = [
         imagen="https://images.pexels.com/photos/5946922/pexels-photo-5946922.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
     # Rosados usados en rosados.html
-    Producto(
+    ProductoRec(
         id="ros-01",
         nombre="Rosé Costa Fresca",
         tipo="rosado",
@@ -267,7 +416,7 @@ CATALOGO: List[Producto] = [
         precio=8990,
         imagen="https://images.pexels.com/photos/5947020/pexels-photo-5947020.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="ros-02",
         nombre="Rosé de Syrah",
         tipo="rosado",
@@ -276,7 +425,7 @@ CATALOGO: List[Producto] = [
         precio=9490,
         imagen="https://images.pexels.com/photos/5947024/pexels-photo-5947024.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="ros-03",
         nombre="Rosé Tarde de Verano",
         tipo="rosado",
@@ -286,7 +435,7 @@ CATALOGO: List[Producto] = [
         imagen="https://images.pexels.com/photos/5947026/pexels-photo-5947026.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
     # Espumantes de espumantes.html (aprox)
-    Producto(
+    ProductoRec(
         id="esp-01",
         nombre="Espumante Brut Tradición",
         tipo="espumante",
@@ -295,7 +444,7 @@ CATALOGO: List[Producto] = [
         precio=10990,
         imagen="https://images.pexels.com/photos/5947023/pexels-photo-5947023.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="esp-02",
         nombre="Espumante Rosé",
         tipo="espumante",
@@ -304,7 +453,7 @@ CATALOGO: List[Producto] = [
         precio=11990,
         imagen="https://images.pexels.com/photos/5947021/pexels-photo-5947021.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Producto(
+    ProductoRec(
         id="esp-03",
         nombre="Espumante Brut Nature",
         tipo="espumante",
@@ -313,11 +462,11 @@ CATALOGO: List[Producto] = [
         precio=12990,
         imagen="https://images.pexels.com/photos/5947023/pexels-photo-5947023.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-]
+)
 
 # Ofertas alineadas con ofertas.html
-OFERTAS: List[Oferta] = [
-    Oferta(
+OFERTAS: Tuple[OfertaRec, ...] = (
+    OfertaRec(
         id="of-01",
         producto_id="p01",
         nombre="Pack 3x Cabernet Reserva",
@@ -328,7 +477,7 @@ OFERTAS: List[Oferta] = [
         club_only=False,
         imagen="https://images.pexels.com/photos/2149149/pexels-photo-2149149.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Oferta(
+    OfertaRec(
         id="of-02",
         producto_id="p02",
         nombre="Caja 6x Sauvignon Blanc Costa",
@@ -339,7 +488,7 @@ OFERTAS: List[Oferta] = [
         club_only=True,
         imagen="https://images.pexels.com/photos/2903166/pexels-photo-2903166.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Oferta(
+    OfertaRec(
         id="of-03",
         producto_id="ros-01",
         nombre="Dúo Rosé + Espumante",
@@ -350,7 +499,7 @@ OFERTAS: List[Oferta] = [
         club_only=False,
         imagen="https://images.pexels.com/photos/5947021/pexels-photo-5947021.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-    Oferta(
+    OfertaRec(
         id="of-04",
         producto_id="esp-01",
         nombre="Pack 4x Espumante Brut",
@@ -361,59 +510,83 @@ OFERTAS: List[Oferta] = [
         club_only=True,
         imagen="https://images.pexels.com/photos/5947023/pexels-photo-5947023.jpeg?auto=compress&cs=tinysrgb&w=1200",
     ),
-]
+)
 
 # Tiendas alineadas con tiendas.html
-TIENDAS: List[Tienda] = [
-    Tienda(
+TIENDAS: Tuple[TiendaRec, ...] = (
+    TiendaRec(
         id="st-providencia",
         comuna="Providencia",
         nombre="Viña Urbana Providencia",
         direccion="Av. Providencia 1234, Providencia, Santiago",
         horario="Lunes a sábado 11:00–21:00",
         telefono="+56 2 2222 1111",
-        servicios=[
+        servicios=(
             "Sala de degustación",
             "Retiro de compras online",
             "Asesoría de sommelier",
-        ],
+        ),
         imagen="https://images.pexels.com/photos/941864/pexels-photo-941864.jpeg?auto=compress&cs=tinysrgb&w=1200",
         maps_url="https://maps.google.com/?q=Providencia+1234+Santiago",
     ),
-    Tienda(
+    TiendaRec(
         id="st-lascondes",
         comuna="Las Condes",
         nombre="Viña Urbana Las Condes",
         direccion="Av. Apoquindo 3456, Las Condes, Santiago",
         horario="Lunes a domingo 11:00–22:00",
         telefono="+56 2 2333 2222",
-        servicios=[
+        servicios=(
             "Eventos privados y catas",
             "Estacionamiento clientes",
             "Club pick-up (membresía)",
-        ],
+        ),
         imagen="https://images.pexels.com/photos/1407858/pexels-photo-1407858.jpeg?auto=compress&cs=tinysrgb&w=1200",
         maps_url="https://maps.google.com/?q=Apoquindo+3456+Santiago",
     ),
-    Tienda(
+    TiendaRec(
         id="st-nunoa",
         comuna="Ñuñoa",
         nombre="Viña Urbana Ñuñoa",
         direccion="Av. Irarrázaval 789, Ñuñoa, Santiago",
         horario="Martes a domingo 12:00–21:00",
         telefono="+56 2 2444 3333",
-        servicios=[
+        servicios=(
             "Bar de vinos por copa",
             "Retiro de pedidos web",
             "Talleres y charlas (demo)",
-        ],
+        ),
         imagen="https://images.pexels.com/photos/2147855/pexels-photo-2147855.jpeg?auto=compress&cs=tinysrgb&w=1200",
         maps_url="https://maps.google.com/?q=Irarrázaval+789+Santiago",
     ),
-]
+)
+
+# Respuestas serializadas una sola vez: CATALOGO/OFERTAS/TIENDAS no cambian en runtime
+_CATALOGO_DICTS: List[dict] = [asdict(p) for p in CATALOGO]
+_OFERTAS_DICTS: List[dict] = [asdict(o) for o in OFERTAS]
+_TIENDAS_DICTS: List[dict] = [asdict(t) for t in TIENDAS]
+_TIENDAS_BY_COMUNA: Dict[str, List[dict]] = {}
+for _t in _TIENDAS_DICTS:
+    _TIENDAS_BY_COMUNA.setdefault(_t["comuna"].lower(), []).append(_t)
+del _t
+
+# Índices del catálogo: id -> producto serializado, y campos ya en minúsculas.
+# CATALOGO_INDEX va ordenado por precio (y posición original) para resolver
+# el rango de precios con bisect; CATALOGO_PRECIOS es la columna de precios.
+CATALOGO_BY_ID: Dict[str, dict] = {d["id"]: d for d in _CATALOGO_DICTS}
+CATALOGO_INDEX = sorted(
+    (p.precio, pos, p.tipo.lower(), p.cepa.lower(), p.origen.lower(), d)
+    for pos, (p, d) in enumerate(zip(CATALOGO, _CATALOGO_DICTS))
+)
+CATALOGO_PRECIOS: List[int] = [e[0] for e in CATALOGO_INDEX]
+
+# Cuerpo JSON del catálogo completo ya codificado (se envía tal cual)
+_CATALOGO_BYTES: bytes = orjson.dumps(
+    {"statusCode": 200, "message": "Catálogo completo", "data": _CATALOGO_DICTS}
+)
 
 # Stock mínimo de ejemplo para H-05
-db_stock.append({"nombre": "Cabernet Sauvignon Reserva", "stock": 3})
+db_stock["cabernet sauvignon reserva"] = {"nombre": "Cabernet Sauvignon Reserva", "stock": 3}
 
 
 # ============================================================
@@ -421,7 +594,7 @@ db_stock.append({"nombre": "Cabernet Sauvignon Reserva", "stock": 3})
 # ============================================================
 
 def get_user_by_email(email: str) -> Optional[User]:
-    return next((u for u in db_users if u.email.lower() == email.lower()), None)
+    return db_users_by_email.get(email.lower())
 
 
 def autenticar_usuario(email: str, password: str) -> Optional[User]:
@@ -433,15 +606,18 @@ def autenticar_usuario(email: str, password: str) -> Optional[User]:
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
-    Token esperado: 'token-<email>'
-    Ejemplo: 'token-benja@example.com'
+    Token esperado: el generado por crear_token al iniciar sesión.
     """
     cred_exception = HTTPException(status_code=401, detail="Token inválido")
 
-    if not token.startswith("token-"):
+    datos = _verificar_token(token)
+    if datos is None:
+        raise cred_exception
+
+    email, exp = datos
+    if exp < time.time():
         raise cred_exception
 
-    email = token[len("token-"):]
     user = get_user_by_email(email)
 
     if user is None:
@@ -454,12 +630,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
 # ENDPOINTS GENERALES
 # ============================================================
 
+_ROOT_BYTES: bytes = orjson.dumps({
+    "mensaje": "API Viña Urbana operativa. Visita /docs para explorar los endpoints.",
+    "version": "1.1.0",
+})
+
+
 @app.get("/")
-def root():
-    return {
-        "mensaje": "API Viña Urbana operativa. Visita /docs para explorar los endpoints.",
-        "version": "1.1.0",
-    }
+async def root():
+    return RawResponse(content=_ROOT_BYTES, media_type="application/json")
 
 
 # ============================================================
@@ -478,9 +657,9 @@ def registrar_usuario(input: UserRegistrationInput):
         name=input.name,
         hashed_password=hashed,
     )
-    db_users.append(nuevo)
+    db_users_by_email[input.email.lower()] = nuevo
 
-    print(f"Usuario registrado: {nuevo.email} con preferencias {input.preferencias}")
+    logger.debug("Usuario registrado: %s con preferencias %s", nuevo.email, input.preferencias)
     return nuevo
 
 
@@ -488,25 +667,27 @@ def registrar_usuario(input: UserRegistrationInput):
 # LOGIN / TOKENS
 # ============================================================
 
-@app.post(f"{API_PREFIX}/sesion/inicio", response_model=TokenResponse, tags=["Autenticación"])
-def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
-    # OAuth2PasswordRequestForm usa "username" para el correo
-    user = autenticar_usuario(form_data.username, form_data.password)
+def _emitir_token(email: str, password: str) -> RawResponse:
+    """Valida credenciales y arma la respuesta del token sin pasar por TokenResponse."""
+    user = autenticar_usuario(email, password)
     if not user:
         raise HTTPException(status_code=400, detail="Credenciales incorrectas")
 
     access_token = crear_token({"sub": user.email})
-    return TokenResponse(access_token=access_token)
+    body = orjson.dumps({"access_token": access_token, "token_type": "bearer"})
+    return RawResponse(content=body, media_type="application/json")
 
 
-@app.post(f"{API_PREFIX}/sesion/login-json", response_model=TokenResponse, tags=["Autenticación"])
-def login_json(input: LoginInput):
-    user = autenticar_usuario(input.email, input.password)
-    if not user:
-        raise HTTPException(status_code=400, detail="Credenciales incorrectas")
+# TokenResponse se deja solo en `responses` para la documentación OpenAPI
+@app.post(f"{API_PREFIX}/sesion/inicio", responses={200: {"model": TokenResponse}}, tags=["Autenticación"])
+def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
+    # OAuth2PasswordRequestForm usa "username" para el correo
+    return _emitir_token(form_data.username, form_data.password)
 
-    access_token = crear_token({"sub": user.email})
-    return TokenResponse(access_token=access_token)
+
+@app.post(f"{API_PREFIX}/sesion/login-json", responses={200: {"model": TokenResponse}}, tags=["Autenticación"])
+def login_json(input: LoginInput):
+    return _emitir_token(input.email, input.password)
 
 
 # ============================================================
@@ -522,61 +703,68 @@ class CatalogFilter(BaseModel):
     precio_max: Optional[float] = None
 
 
-@app.get(f"{API_PREFIX}/catalogo/listar", response_model=Response, tags=["Catálogo"])
-def listar_catalogo():
+@app.get(f"{API_PREFIX}/catalogo/listar", responses={200: {"model": RespuestaProductos}}, tags=["Catálogo"])
+async def listar_catalogo():
     """Devuelve todo el catálogo que usan los HTML."""
-    return Response(data=[p.dict() for p in CATALOGO], message="Catálogo completo")
+    return RawResponse(content=_CATALOGO_BYTES, media_type="application/json")
 
 
-@app.get(f"{API_PREFIX}/catalogo/producto", response_model=Response, tags=["Catálogo"])
-def obtener_producto(producto_id: str):
-    prod = next((p for p in CATALOGO if p.id == producto_id), None)
+@app.get(f"{API_PREFIX}/catalogo/producto", responses={200: {"model": RespuestaProducto}}, tags=["Catálogo"])
+async def obtener_producto(producto_id: str):
+    prod = CATALOGO_BY_ID.get(producto_id)
     if not prod:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return Response(data=prod.dict(), message="Producto encontrado")
+    return _respuesta_json(data=prod, message="Producto encontrado")
 
 
-@app.get(f"{API_PREFIX}/catalogo/filtrar", response_model=Response, tags=["Catálogo"])
-def filtrar_catalogo(filtros: CatalogFilter = Depends()):
-    print(f"Aplicando filtros: {filtros}")
-    filtrados: List[Producto] = []
+@app.get(f"{API_PREFIX}/catalogo/filtrar", responses={200: {"model": RespuestaProductos}}, tags=["Catálogo"])
+async def filtrar_catalogo(filtros: CatalogFilter = Depends()):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Aplicando filtros: %r", filtros)
+    encontrados: List[tuple] = []
 
-    for p in CATALOGO:
-        if filtros.tipo and filtros.tipo.lower() != p.tipo.lower():
-            continue
-        if filtros.cepa and filtros.cepa.lower() not in p.cepa.lower():
-            continue
-        if filtros.origen and filtros.origen.lower() not in p.origen.lower():
+    tipo_lc = filtros.tipo.lower() if filtros.tipo else None
+    cepa_lc = filtros.cepa.lower() if filtros.cepa else None
+    origen_lc = filtros.origen.lower() if filtros.origen else None
+
+    # El rango de precios se acota sobre la columna ordenada, sin recorrerla
+    desde = 0 if filtros.precio_min is None else bisect_left(CATALOGO_PRECIOS, filtros.precio_min)
+    hasta = len(CATALOGO_PRECIOS) if filtros.precio_max is None else bisect_right(CATALOGO_PRECIOS, filtros.precio_max)
+
+    for _, pos, tipo, cepa, origen, p in CATALOGO_INDEX[desde:hasta]:
+        if tipo_lc and tipo_lc != tipo:
             continue
-        if filtros.precio_min is not None and p.precio < filtros.precio_min:
+        if cepa_lc and cepa_lc not in cepa:
             continue
-        if filtros.precio_max is not None and p.precio > filtros.precio_max:
+        if origen_lc and origen_lc not in origen:
             continue
-        filtrados.append(p)
+        encontrados.append((pos, p))
 
-    return Response(data=[f.dict() for f in filtrados], message="Resultados del filtro")
+    # Se devuelven en el mismo orden que CATALOGO
+    encontrados.sort(key=lambda e: e[0])
+    filtrados = [p for _, p in encontrados]
+    return _respuesta_json(data=filtrados, message="Resultados del filtro")
 
 
 # ============================================================
 # ENDPOINTS EXTRA FRONT: OFERTAS, TIENDAS
 # ============================================================
 
-@app.get(f"{API_PREFIX}/ofertas", response_model=Response, tags=["Catálogo"])
-def listar_ofertas():
+@app.get(f"{API_PREFIX}/ofertas", responses={200: {"model": RespuestaOfertas}}, tags=["Catálogo"])
+async def listar_ofertas():
     """Ofertas alineadas con ofertas.html"""
-    return Response(
-        data=[o.dict() for o in OFERTAS],
+    return _respuesta_json(
+        data=_OFERTAS_DICTS,
         message="Ofertas activas",
     )
 
 
-@app.get(f"{API_PREFIX}/tiendas", response_model=Response, tags=["Tiendas"])
-def listar_tiendas(comuna: Optional[str] = None):
+@app.get(f"{API_PREFIX}/tiendas", responses={200: {"model": RespuestaTiendas}}, tags=["Tiendas"])
+async def listar_tiendas(comuna: Optional[str] = None):
     """Tiendas físicas (Providencia, Las Condes, Ñuñoa)."""
     if comuna:
-        filtradas = [t for t in TIENDAS if t.comuna.lower() == comuna.lower()]
-        return Response(data=[t.dict() for t in filtradas], message="Tiendas filtradas")
-    return Response(data=[t.dict() for t in TIENDAS], message="Tiendas disponibles")
+        return _respuesta_json(data=_TIENDAS_BY_COMUNA.get(comuna.lower(), []), message="Tiendas filtradas")
+    return _respuesta_json(data=_TIENDAS_DICTS, message="Tiendas disponibles")
 
 
 # ============================================================
@@ -597,7 +785,7 @@ def activar_membresia(input: MembresiaInput, user: User = Depends(get_current_us
         "fecha": datetime.now(),
     }
     db_membresias.append(registro)
-    print(f"Membresía {input.tipo} activada para {user.email}")
+    logger.debug("Membresía %s activada para %s", input.tipo, user.email)
     return Response(message=f"Membresía {input.tipo} activada correctamente", data=registro)
 
 
@@ -623,7 +811,7 @@ def enviar_notificacion(input: NotificacionInput, user: User = Depends(get_curre
         "fecha": datetime.now(),
     }
     db_notificaciones.append(registro)
-    print(f"Notificación enviada a {user.email} por {input.canal}")
+    logger.debug("Notificación enviada a %s por %s", user.email, input.canal)
     return Response(message="Notificación procesada", data=registro)
 
 
@@ -637,22 +825,31 @@ class ProductoStock(BaseModel):
     stock: int
 
 
+# Evita sobreventa cuando dos requests reservan el mismo producto a la vez.
+# Basta con un lock del proceso: db_stock vive en memoria de un solo worker.
+_stock_lock = asyncio.Lock()
+
+
 @app.post(f"{API_PREFIX}/stock/reservar", response_model=Response, tags=["Inventario"])
-def reservar_stock(nombre: str, cantidad: int):
-    for p in db_stock:
-        if p["nombre"].lower() == nombre.lower():
-            if p["stock"] < cantidad:
-                raise HTTPException(status_code=400, detail="Stock insuficiente")
-            p["stock"] -= cantidad
-            print(f"Reservadas {cantidad} unidades de {nombre}")
-            return Response(message=f"{cantidad} unidades reservadas de {nombre}")
-    raise HTTPException(status_code=404, detail="Producto no encontrado")
+async def reservar_stock(nombre: str, cantidad: int):
+    p = db_stock.get(nombre.lower())
+    if not p:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    async with _stock_lock:
+        if p["stock"] < cantidad:
+            raise HTTPException(status_code=400, detail="Stock insuficiente")
+        p["stock"] -= cantidad
+    logger.debug("Reservadas %s unidades de %s", cantidad, nombre)
+    return Response(message=f"{cantidad} unidades reservadas de {nombre}")
 
 
 # ============================================================
 # H-06: Seguimiento de pedido y despacho
 # ============================================================
 
+ESTADOS_PEDIDO = ("Preparando", "Despachado", "En ruta", "Entregado")
+
+
 class Pedido(BaseModel):
     id: UUID = Field(default_factory=uuid4)
     usuario: str
@@ -665,21 +862,21 @@ def crear_pedido(user: User = Depends(get_current_user)):
     pedido = Pedido(
         usuario=user.email,
         estado="Preparando",
-        tracking=f"TRK-{random.randint(1000, 9999)}",
+        tracking=f"TRK-{_rng.randrange(1000, 10000)}",
     )
-    db_pedidos.append(pedido)
-    print(f"Pedido {pedido.id} creado para {user.email}")
+    db_pedidos[pedido.id] = pedido
+    logger.debug("Pedido %s creado para %s", pedido.id, user.email)
     return pedido
 
 
-@app.get(f"{API_PREFIX}/pedidos/seguimiento", response_model=Response, tags=["Pedidos"])
+@app.get(f"{API_PREFIX}/pedidos/seguimiento", responses=DOC_RESPONSE, tags=["Pedidos"])
 def seguimiento_pedido(pedido_id: UUID):
-    pedido = next((p for p in db_pedidos if p.id == pedido_id), None)
+    pedido = db_pedidos.get(pedido_id)
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
-    avance = random.choice(["Preparando", "Despachado", "En ruta", "Entregado"])
+    avance = _rng.choice(ESTADOS_PEDIDO)
     pedido.estado = avance
-    return Response(
+    return _respuesta_json(
         data={"id": str(pedido.id), "estado": pedido.estado, "tracking": pedido.tracking},
         message="Estado actualizado",
     )
@@ -693,17 +890,19 @@ class ChatbotInput(BaseModel):
     plato: str
 
 
+SUGERENCIAS_MARIDAJE = {
+    "carne": "Cabernet Sauvignon",
+    "pescado": "Sauvignon Blanc",
+    "pasta": "Merlot",
+    "queso": "Carmenere",
+}
+
+
 @app.post(f"{API_PREFIX}/maridaje/chatbot", response_model=Response, tags=["Maridaje"])
 def chatbot_maridaje(input: ChatbotInput):
-    sugerencias = {
-        "carne": "Cabernet Sauvignon",
-        "pescado": "Sauvignon Blanc",
-        "pasta": "Merlot",
-        "queso": "Carmenere",
-    }
     plato = input.plato.lower()
-    vino = sugerencias.get(plato, "Pinot Noir")
-    print(f"Sugerencia chatbot para {plato}: {vino}")
+    vino = SUGERENCIAS_MARIDAJE.get(plato, "Pinot Noir")
+    logger.debug("Sugerencia chatbot para %s: %s", plato, vino)
     return Response(message=f"Recomendado para {plato}: {vino}")
 
 
@@ -717,19 +916,21 @@ class TicketInput(BaseModel):
     mensaje: str
 
 
+SLA_POR_CANAL = {"email": "24h", "whatsapp": "5min", "telefono": "10min"}
+
+
 @app.post(f"{API_PREFIX}/soporte/ticket", response_model=Response, tags=["Atención Cliente"])
 def crear_ticket(input: TicketInput, user: User = Depends(get_current_user)):
-    tiempo = {"email": "24h", "whatsapp": "5min", "telefono": "10min"}
     registro = {
         "usuario": user.email,
         "canal": input.canal,
         "prioridad": input.prioridad,
         "mensaje": input.mensaje,
-        "SLA": tiempo.get(input.canal, "24h"),
+        "SLA": SLA_POR_CANAL.get(input.canal, "24h"),
         "fecha": datetime.now(),
     }
     db_tickets.append(registro)
-    print(f"Ticket creado para {user.email} via {input.canal}")
+    logger.debug("Ticket creado para %s via %s", user.email, input.canal)
     return Response(message="Ticket registrado", data=registro)
 
 
@@ -754,7 +955,7 @@ def sincronizar_marketplace(input: MarketplaceSyncInput):
         "fecha": datetime.now(),
     }
     db_marketplace.append(registro)
-    print(f"Marketplace sincronizado: {input.producto}")
+    logger.debug("Marketplace sincronizado: %s", input.producto)
     return Response(message="Sincronización completada", data=registro)
 
 
@@ -777,7 +978,7 @@ def registrar_alianza(input: AlianzaInput):
         "fecha": datetime.now(),
     }
     db_alianzas.append(registro)
-    print(f"Alianza creada con {input.restaurante}")
+    logger.debug("Alianza creada con %s", input.restaurante)
     return Response(message="Alianza registrada", data=registro)
 
 
@@ -785,19 +986,36 @@ def registrar_alianza(input: AlianzaInput):
 # H-11: Dashboard de métricas
 # ============================================================
 
-@app.get(f"{API_PREFIX}/metricas/dashboard", response_model=Response, tags=["Analítica"])
+# (segundo, fecha) en una sola tupla: dashboard_metricas es sync y corre en
+# el threadpool, y una sola asignación nunca deja ver un segundo nuevo con la
+# fecha vieja
+_fecha_cache: Tuple[int, str] = (0, "")
+
+
+def _fecha_hoy() -> str:
+    """Fecha actual 'YYYY-MM-DD', formateada como máximo una vez por segundo."""
+    global _fecha_cache
+    seg = int(time.time())
+    cache = _fecha_cache
+    if cache[0] != seg:
+        cache = (seg, datetime.fromtimestamp(seg).strftime("%Y-%m-%d"))
+        _fecha_cache = cache
+    return cache[1]
+
+
+@app.get(f"{API_PREFIX}/metricas/dashboard", responses=DOC_RESPONSE, tags=["Analítica"])
 def dashboard_metricas():
-    ventas = random.randint(20, 50)
-    ticket_promedio = round(random.uniform(8000, 15000), 2)
-    clientes_nuevos = random.randint(3, 10)
+    ventas = _rng.randrange(20, 51)
+    ticket_promedio = round(_rng.uniform(8000, 15000), 2)
+    clientes_nuevos = _rng.randrange(3, 11)
     data = {
         "ventas": ventas,
         "ticket_promedio": ticket_promedio,
         "clientes_nuevos": clientes_nuevos,
-        "fecha": datetime.now().strftime("%Y-%m-%d"),
+        "fecha": _fecha_hoy(),
     }
-    print("Dashboard actualizado con métricas simuladas.")
-    return Response(message="Métricas generadas", data=data)
+    logger.debug("Dashboard actualizado con métricas simuladas.")
+    return _respuesta_json(message="Métricas generadas", data=data)
 
 
 # ============================================================
@@ -809,13 +1027,15 @@ class PrediccionInput(BaseModel):
     mes: str
 
 
+DEMANDA_BASE = {"Syrah": 120, "Pinot Noir": 90, "Carmenere": 75, "Cabernet": 130}
+
+
 @app.post(f"{API_PREFIX}/demanda/predecir", response_model=Response, tags=["Analítica"])
 def predecir_demanda(input: PrediccionInput):
-    base = {"Syrah": 120, "Pinot Noir": 90, "Carmenere": 75, "Cabernet": 130}
-    estimacion = base.get(input.cepa, random.randint(50, 100))
-    ajuste = random.uniform(0.9, 1.2)
+    estimacion = DEMANDA_BASE.get(input.cepa) or _rng.randrange(50, 101)
+    ajuste = _rng.uniform(0.9, 1.2)
     demanda = round(estimacion * ajuste)
-    print(f"Predicción: {input.cepa} en {input.mes} → {demanda} botellas estimadas")
+    logger.debug("Predicción: %s en %s → %s botellas estimadas", input.cepa, input.mes, demanda)
     return Response(
         message="Predicción de demanda generada",
         data={"cepa": input.cepa, "mes": input.mes, "estimado": demanda},
@@ -837,18 +1057,18 @@ class EtiquetaDigital(BaseModel):
 @app.post(f"{API_PREFIX}/etiquetas/registrar", response_model=Response, tags=["Sostenibilidad"])
 def registrar_etiqueta(input: EtiquetaDigital):
     db_etiquetas.append(input)
-    print(f"Etiqueta digital registrada para {input.vino}")
-    return Response(message="Etiqueta registrada", data=input.dict())
+    logger.debug("Etiqueta digital registrada para %s", input.vino)
+    return Response(message="Etiqueta registrada", data=input.model_dump(mode="json"))
 
 
-@app.get(f"{API_PREFIX}/etiquetas/ver", response_model=Response, tags=["Sostenibilidad"])
+@app.get(f"{API_PREFIX}/etiquetas/ver", responses=DOC_RESPONSE, tags=["Sostenibilidad"])
 def ver_etiqueta(vino: str):
     etiqueta = next((e for e in db_etiquetas if e.vino.lower() == vino.lower()), None)
     if not etiqueta:
         raise HTTPException(status_code=404, detail="Etiqueta no encontrada")
     if not etiqueta.vigente:
-        return Response(message="Etiqueta expirada", data=etiqueta.dict())
-    return Response(message="Etiqueta encontrada", data=etiqueta.dict())
+        return _respuesta_json(message="Etiqueta expirada", data=etiqueta.model_dump(mode="json"))
+    return _respuesta_json(message="Etiqueta encontrada", data=etiqueta.model_dump(mode="json"))
 
 
 # ============================================================
@@ -871,7 +1091,7 @@ def registrar_donacion(input: DonacionInput, user: User = Depends(get_current_us
         "fecha": datetime.now(),
     }
     db_donaciones.append(registro)
-    print(f"{user.email} aportó ${aporte} a {input.ong}")
+    logger.debug("%s aportó $%s a %s", user.email, aporte, input.ong)
     return Response(message="Donación registrada", data=registro)
 
 
@@ -890,15 +1110,15 @@ class VisitaVirtual(BaseModel):
 @app.post(f"{API_PREFIX}/visitas/registrar", response_model=Response, tags=["Experiencias"])
 def registrar_visita(input: VisitaVirtual):
     db_visitas.append(input)
-    print(f"Visita virtual registrada: {input.bodega}")
-    return Response(message="Visita registrada", data=input.dict())
+    logger.debug("Visita virtual registrada: %s", input.bodega)
+    return Response(message="Visita registrada", data=input.model_dump(mode="json"))
 
 
-@app.get(f"{API_PREFIX}/visitas/listar", response_model=Response, tags=["Experiencias"])
+@app.get(f"{API_PREFIX}/visitas/listar", responses=DOC_RESPONSE, tags=["Experiencias"])
 def listar_visitas():
-    return Response(
+    return _respuesta_json(
         message="Listado de experiencias virtuales",
-        data=[v.dict() for v in db_visitas],
+        data=[v.model_dump(mode="json") for v in db_visitas],
     )
 
 
@@ -916,16 +1136,16 @@ class MaridajeInteractivo(BaseModel):
 @app.post(f"{API_PREFIX}/maridajes/registrar", response_model=Response, tags=["Maridajes"])
 def registrar_maridaje(input: MaridajeInteractivo):
     db_maridajes.append(input)
-    print(f"Maridaje interactivo registrado para {input.vino}")
-    return Response(message="Maridaje registrado", data=input.dict())
+    logger.debug("Maridaje interactivo registrado para %s", input.vino)
+    return Response(message="Maridaje registrado", data=input.model_dump(mode="json"))
 
 
-@app.get(f"{API_PREFIX}/maridajes/ver", response_model=Response, tags=["Maridajes"])
+@app.get(f"{API_PREFIX}/maridajes/ver", responses=DOC_RESPONSE, tags=["Maridajes"])
 def ver_maridaje(vino: str):
     maridaje = next((m for m in db_maridajes if m.vino.lower() == vino.lower()), None)
     if not maridaje:
         raise HTTPException(status_code=404, detail="Maridaje no encontrado")
-    return Response(message="Maridaje encontrado", data=maridaje.dict())
+    return _respuesta_json(message="Maridaje encontrado", data=maridaje.model_dump(mode="json"))
 
 
 # ============================================================
@@ -1,40 +1,111 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from fastapi.responses import Response as RawResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, Any, Callable, Iterator, Optional, List, Dict, Tuple
 from uuid import UUID, uuid4
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+import anyio.to_thread
+import asyncio
 import hashlib
+import hmac
+import logging
+import orjson
+import os
+import itertools
 import random
-API_PREFIX = "/api/vinaurbana"
-
-app = FastAPI(
-    title="API Viña Urbana",
-    description="Plataforma boutique de vinos - Proyecto Viña Urbana",
-    version="1.0.0"
-)
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_PREFIX}/sesion/inicio")
+import secrets
+import sys
+import time
 
 # ============================================================
 # CONFIGURACIÓN GENERAL - VIÑA URBANA
 # ============================================================
+API_PREFIX = "/api/vinaurbana"
 SECRET_KEY = ""
 ALGORITHM = ""
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-
-
-
+THREADPOOL_TOKENS = 200  # AnyIO trae 40 por defecto
+
+# Con VINAURBANA_REDIS_URL (ej. redis://localhost:6379/0) todo lo que la API
+# vuelve a leer se comparte en Redis: usuarios, stock, pedidos, etiquetas,
+# maridajes y visitas, así que se puede correr con varios workers
+# (VINAURBANA_WORKERS). Sin ella todo queda en memoria del proceso y se corre
+# con un solo worker (requiere `pip install redis`). Los registros de solo
+# escritura (membresías, notificaciones, tickets, marketplace, alianzas,
+# donaciones) siguen por proceso: ningún endpoint los lee de vuelta.
+REDIS_URL = os.environ.get("VINAURBANA_REDIS_URL")
+redis_client = None
+
+# Reloj de baja resolución para las fechas de auditoría de los registros:
+# una tarea del lifespan lo refresca cada RELOJ_INTERVALO_S segundos, así los
+# endpoints no consultan el reloj del SO en cada insert
+RELOJ_INTERVALO_S = 0.05
+_ahora: Optional[datetime] = None
+
+def ahora() -> datetime:
+    # Fuera del lifespan (sin tarea de reloj) se cae a datetime.now()
+    return _ahora or datetime.now()
+
+async def _refrescar_reloj() -> None:
+    global _ahora
+    while True:
+        _ahora = datetime.now()
+        await asyncio.sleep(RELOJ_INTERVALO_S)
+
+# Los endpoints loguean en DEBUG con formato perezoso (%s): con el nivel en
+# WARNING no se arma el texto ni se escribe a stdout en cada request
+logger = logging.getLogger("vinaurbana")
+logger.setLevel(logging.WARNING)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lo que quede sync (o bloqueante a futuro) corre en el threadpool de AnyIO;
+    # con el límite por defecto se encolaría sobre 40 requests simultáneos.
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = THREADPOOL_TOKENS
+
+    global redis_client, _ahora
+    reloj = None
+    try:
+        # Redis primero: si no responde, el arranque falla antes de lanzar
+        # tareas, y el finally cierra igual la conexión a medio abrir
+        if REDIS_URL:
+            import redis.asyncio as aioredis
+
+            redis_client = aioredis.from_url(REDIS_URL)
+            # El stock inicial se carga solo si otro proceso no lo cargó antes
+            for clave, p in db_stock.items():
+                await redis_client.set(f"stock:{clave}", p["stock"], nx=True)
+
+        reloj = asyncio.create_task(_refrescar_reloj())
+        notif_batcher.iniciar()
+        marketplace_batcher.iniciar()
+        yield
+    finally:
+        await notif_batcher.detener()
+        await marketplace_batcher.detener()
+        if reloj is not None:
+            reloj.cancel()
+        _ahora = None
+        if redis_client is not None:
+            await redis_client.aclose()
+            redis_client = None
+
+
+# Sin default_response_class: con response_model FastAPI ya serializa la
+# salida a bytes directo con Pydantic (ORJSONResponse quedó deprecada)
 app = FastAPI(
     title="API Viña Urbana",
     description="Plataforma boutique de vinos - Proyecto Viña Urbana",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-API_PREFIX = "/api/vinaurbana"
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_PREFIX}/sesion/inicio")
 
 # CORS para que puedas pegarle desde cualquier frontend
 app.add_middleware(
@@ -48,24 +119,55 @@ app.add_middleware(
 # ============================================================
 # MODELOS BASE
 # ============================================================
-class Response(BaseModel):
+# IDs que nunca se usan como clave de búsqueda sin autenticación (etiquetas,
+# visitas, maridajes, stock) salen de un PRNG sembrado una vez desde el SO,
+# sin un os.urandom() por registro. User y Pedido siguen con uuid4: el UUID
+# del pedido es lo único que protege /pedidos/{pedido_id}, y el estado de
+# MT19937 se reconstruye a partir de los IDs que ya entregó.
+_id_rng = random.Random(secrets.token_bytes(16))
+
+def _fast_uuid() -> UUID:
+    return UUID(int=_id_rng.getrandbits(128), version=4)
+
+# Valores simulados (métricas, demanda, tracking, avance de pedidos): se
+# sortean al importar con un generador propio (no el de los IDs) y cada
+# request solo hace next() sobre el ciclo. Los pools que se leen juntos en un
+# mismo endpoint usan tamaños coprimos (2**12 y primos cercanos), así la tupla
+# completa no se repite cada POOL_SIMULADO requests sino tras su producto.
+POOL_SIMULADO = 1 << 12
+_sim_rng = random.Random(secrets.token_bytes(16))
+
+def _pool(sorteo: Callable[[random.Random], Any], tamaño: int = POOL_SIMULADO) -> Iterator[Any]:
+    return itertools.cycle(tuple(sorteo(_sim_rng) for _ in range(tamaño)))
+
+# Respuestas tipadas por forma de `data`: sin el Union dict | list, Pydantic
+# valida la salida con un validador monomórfico (sin discriminar ramas)
+class ResponseDict(BaseModel):
+    statusCode: int = 200
+    message: str = "OK"
+    data: Optional[dict] = None
+
+class ResponseList(BaseModel):
     statusCode: int = 200
     message: str = "OK"
-    data: Optional[dict | list] = None
+    data: Optional[List[dict]] = None
 
 # --- Autenticación ---
+# Los registros que solo se insertan y leen (User, etiquetas, visitas,
+# maridajes) se declaran frozen; Pedido no, porque seguimiento actualiza estado.
 class User(BaseModel):
+    model_config = ConfigDict(frozen=True)
     id: UUID = Field(default_factory=uuid4)
     email: str
     name: str
-    hashed_password: str
+    hashed_password: bytes = Field(exclude=True)  # digest SHA-256 crudo, no se devuelve
     createdAt: datetime = Field(default_factory=datetime.now)
 
 class UserRegistrationInput(BaseModel):
     email: str
     name: str
     password: str
-    preferencias: Optional[List[str]] = []
+    preferencias: List[str] = Field(default_factory=list)
 
 class LoginInput(BaseModel):
     email: str
@@ -79,12 +181,13 @@ class TokenResponse(BaseModel):
 # FUNCIONES DE SEGURIDAD
 # ============================================================
 
-def hashear_contraseña(password: str) -> str:
-    # Hash simple para evitar errores con passlib/bcrypt
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+def hashear_contraseña(password: str) -> bytes:
+    # Hash simple para evitar errores con passlib/bcrypt.
+    # Se guarda el digest crudo: sin pasar a hex ni en el registro ni en el login
+    return hashlib.sha256(password.encode("utf-8")).digest()
 
-def verificar_contraseña(plain: str, hashed: str) -> bool:
-    return hashear_contraseña(plain) == hashed
+def verificar_contraseña(plain: str, hashed: bytes) -> bool:
+    return hmac.compare_digest(hashear_contraseña(plain), hashed)
 
 
 def crear_token(data: dict) -> str:
@@ -105,45 +208,178 @@ db_users: List[User] = []
 db_catalogo: List[dict] = []
 db_membresias: List[dict] = []
 db_notificaciones: List[dict] = []
-db_stock: List[dict] = []
+db_stock: Dict[str, dict] = {}  # clave: clave_busqueda(nombre)
+
+# Índices para búsquedas O(1); se escriben junto a cada append. Las claves
+# str se internan al insertar (sys.intern) para que coincidan por identidad
+db_users_by_email: Dict[str, User] = {}
 
 # ============================================================
 # HELPERS
 # ============================================================
-def get_user_by_email(email: str) -> Optional[User]:
-    return next((u for u in db_users if u.email == email), None)
+def clave_busqueda(texto: str) -> str:
+    """Normaliza un nombre (vino, producto) para usarlo como clave de índice.
+
+    Se aplica una vez al insertar y una vez a la consulta, nunca por fila.
+    casefold() y no lower(): pliega también casos como "ß" -> "ss".
+    """
+    return texto.casefold()
+
+async def _redis_registrar_por_vino(coleccion: str, vino: str, raw: str) -> None:
+    """Agrega `raw` a la lista `coleccion` y lo indexa por vino en `<coleccion>:by_vino`.
+
+    HSETNX deja el primero registrado, igual que el setdefault del modo en memoria.
+    """
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.rpush(coleccion, raw)
+        pipe.hsetnx(f"{coleccion}:by_vino", clave_busqueda(vino), raw)
+        await pipe.execute()
+
+class MicroBatcher:
+    """Agrupa requests concurrentes y los procesa con una sola llamada a `procesar`.
+
+    Cada `enviar(item)` espera hasta que se junten `max_batch_size` items o
+    pasen `max_delay` segundos desde el primero; `procesar(lista)` debe
+    devolver un resultado por item, en el mismo orden. Si el batcher no está
+    iniciado (fuera del lifespan), el item se procesa solo, de inmediato.
+    Al detenerlo se procesa lo que quedó en cola, así ningún `enviar` queda
+    esperando un futuro que nunca se resuelve.
+    """
+
+    def __init__(self, procesar: Callable[[List[Any]], List[Any]], max_batch_size: int = 64, max_delay: float = 0.05):
+        self._procesar = procesar
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._lote: List[tuple] = []  # lote que _bucle está juntando
+
+    def iniciar(self) -> None:
+        self._cola = asyncio.Queue()
+        self._tarea = asyncio.create_task(self._bucle(self._cola))
+
+    async def detener(self) -> None:
+        # Sin cola, los enviar() que lleguen mientras se drena se procesan solos
+        cola, self._cola = self._cola, None
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        self._tarea = None
+        pendientes, self._lote = self._lote, []
+        while cola is not None and not cola.empty():
+            pendientes.append(cola.get_nowait())
+        for i in range(0, len(pendientes), self._max_batch_size):
+            self._despachar(pendientes[i:i + self._max_batch_size])
+
+    async def enviar(self, item: Any) -> Any:
+        if self._cola is None:
+            return self._procesar([item])[0]
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((item, futuro))
+        return await futuro
+
+    def _despachar(self, lote: List[tuple]) -> None:
+        try:
+            resultados = self._procesar([item for item, _ in lote])
+        except Exception as exc:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(exc)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    async def _bucle(self, cola: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._lote = [await cola.get()]
+            limite = loop.time() + self._max_delay
+            while len(self._lote) < self._max_batch_size:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    self._lote.append(await asyncio.wait_for(cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            lote, self._lote = self._lote, []
+            self._despachar(lote)
+
+# En Redis cada usuario es un hash users:<email>; el registro lo crea con un
+# solo EVAL para que dos workers no registren el mismo correo a la vez
+_REGISTRAR_USUARIO_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+def _user_a_redis(user: User) -> List[Any]:
+    return [
+        "id", str(user.id),
+        "email", user.email,
+        "name", user.name,
+        "hashed_password", user.hashed_password,
+        "createdAt", user.createdAt.isoformat(),
+    ]
+
+def _user_desde_redis(campos: Dict[bytes, bytes]) -> User:
+    return User(
+        id=UUID(campos[b"id"].decode()),
+        email=campos[b"email"].decode(),
+        name=campos[b"name"].decode(),
+        hashed_password=campos[b"hashed_password"],
+        createdAt=datetime.fromisoformat(campos[b"createdAt"].decode()),
+    )
+
+async def get_user_by_email(email: str) -> Optional[User]:
+    if redis_client is not None:
+        campos = await redis_client.hgetall(f"users:{email}")
+        return _user_desde_redis(campos) if campos else None
+    return db_users_by_email.get(email)
 
-def autenticar_usuario(email: str, password: str) -> Optional[User]:
-    user = get_user_by_email(email)
+async def autenticar_usuario(email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email(email)
     if not user or not verificar_contraseña(password, user.hashed_password):
         return None
     return user
 
+_TOKEN_PREFIX = "token-"
+_TOKEN_PREFIX_LEN = len(_TOKEN_PREFIX)
+
+# Token -> (vence, usuario). Solo se cachean aciertos: los usuarios no cambian
+# ni se borran, pero un token que hoy falla vale apenas otro worker registre
+# ese correo, así que un fallo nunca se recuerda. El TTL acota cuánto vive
+# cada usuario en la memoria de un worker.
+TOKEN_CACHE_TTL_S = 60.0
+TOKEN_CACHE_MAX = 4096
+_tokens_resueltos: Dict[str, Tuple[float, User]] = {}
+
+async def _resolver_token(token: str) -> Optional[User]:
+    if token[:_TOKEN_PREFIX_LEN] != _TOKEN_PREFIX:
+        return None
+    ahora_s = time.monotonic()
+    en_cache = _tokens_resueltos.get(token)
+    if en_cache is not None and en_cache[0] > ahora_s:
+        return en_cache[1]
+    user = await get_user_by_email(token[_TOKEN_PREFIX_LEN:])  # lo que viene después de 'token-'
+    if user is not None:
+        if len(_tokens_resueltos) >= TOKEN_CACHE_MAX:
+            _tokens_resueltos.clear()
+        _tokens_resueltos[token] = (ahora_s + TOKEN_CACHE_TTL_S, user)
+    return user
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Token esperado: 'token-<email>'
     Ejemplo: 'token-benja@example.com'
     """
-    cred_exception = HTTPException(status_code=401, detail="Token inválido")
-
-    # Validamos formato del token
-    if not token.startswith("token-"):
-        raise cred_exception
-
-    # Sacamos el email desde el token
-    email = token[len("token-"):]  # todo lo que viene después de 'token-'
-
-    # Buscamos el usuario en la "BD"
-    user = get_user_by_email(email) if "get_user_by_email" in globals() else None
-    if user is None:
-        # Si no tienes get_user_by_email, puedes hacer un for:
-        for u in db_users:
-            if u.email == email:
-                user = u
-                break
-
+    user = await _resolver_token(token)
     if user is None:
-        raise cred_exception
+        raise HTTPException(status_code=401, detail="Token inválido")
 
     return user
 
@@ -151,15 +387,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
 # ENDPOINTS GENERALES
 # ============================================================
 @app.get("/")
-def root():
+async def root():
     return {"mensaje": "API Viña Urbana operativa. Visita /docs para explorar los endpoints."}
 
 # ============================================================
 # H-01: Registro con preferencias enológicas
 # ============================================================
 @app.post(f"{API_PREFIX}/usuarios/registro", response_model=User, tags=["Usuarios"])
-def registrar_usuario(input: UserRegistrationInput):
-    if get_user_by_email(input.email):
+async def registrar_usuario(input: UserRegistrationInput):
+    if await get_user_by_email(input.email):
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
     hashed = hashear_contraseña(input.password)
@@ -169,18 +405,24 @@ def registrar_usuario(input: UserRegistrationInput):
         name=input.name,
         hashed_password=hashed,
     )
-    db_users.append(nuevo)
-
-    print(f"Usuario registrado: {nuevo.email} con preferencias {input.preferencias}")
+    if redis_client is not None:
+        creado = await redis_client.eval(_REGISTRAR_USUARIO_LUA, 1, f"users:{nuevo.email}", *_user_a_redis(nuevo))
+        if not creado:  # otro worker lo registró entre el chequeo y el EVAL
+            raise HTTPException(status_code=400, detail="El correo ya está registrado")
+    else:
+        db_users.append(nuevo)
+        db_users_by_email[sys.intern(nuevo.email)] = nuevo
+
+    logger.debug("Usuario registrado: %s con preferencias %s", nuevo.email, input.preferencias)
     return nuevo
 
 # ============================================================
 # LOGIN / TOKENS
 # ============================================================
 @app.post(f"{API_PREFIX}/sesion/inicio", response_model=TokenResponse, tags=["Autenticación"])
-def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
+async def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
     # OAuth2PasswordRequestForm usa "username"
-    user = autenticar_usuario(form_data.username, form_data.password)
+    user = await autenticar_usuario(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Credenciales incorrectas")
 
@@ -188,8 +430,8 @@ def iniciar_sesion(form_data: OAuth2PasswordRequestForm = Depends()):
     return TokenResponse(access_token=access_token)
 
 @app.post(f"{API_PREFIX}/sesion/login-json", response_model=TokenResponse, tags=["Autenticación"])
-def login_json(input: LoginInput):
-    user = autenticar_usuario(input.email, input.password)
+async def login_json(input: LoginInput):
+    user = await autenticar_usuario(input.email, input.password)
     if not user:
         raise HTTPException(status_code=400, detail="Credenciales incorrectas")
 
@@ -205,21 +447,29 @@ class CatalogFilter(BaseModel):
     precio_min: Optional[float] = None
     precio_max: Optional[float] = None
 
-@app.get(f"{API_PREFIX}/catalogo/filtrar", response_model=Response, tags=["Catálogo"])
-def filtrar_catalogo(filtros: CatalogFilter = Depends()):
-    print(f"Aplicando filtros: {filtros}")
-    vinos = [
-        {"nombre": "Syrah Reserva", "cepa": "Syrah", "origen": "Colchagua", "precio": 12000},
-        {"nombre": "Pinot Noir", "cepa": "Pinot Noir", "origen": "Casablanca", "precio": 9800}
-    ]
+# Catálogo de ejemplo, armado una sola vez; junto a cada vino van cepa y
+# origen ya normalizados con clave_busqueda para no repetirlo en cada request
+_CATALOG = [
+    {"nombre": "Syrah Reserva", "cepa": "Syrah", "origen": "Colchagua", "precio": 12000},
+    {"nombre": "Pinot Noir", "cepa": "Pinot Noir", "origen": "Casablanca", "precio": 9800}
+]
+_CATALOG_INDEX = [(clave_busqueda(v["cepa"]), clave_busqueda(v["origen"]), v["precio"], v) for v in _CATALOG]
+
+@app.get(f"{API_PREFIX}/catalogo/filtrar", response_model=ResponseList, tags=["Catálogo"])
+async def filtrar_catalogo(filtros: CatalogFilter = Depends()):
+    logger.debug("Aplicando filtros: %s", filtros)
+    cepa_l = clave_busqueda(filtros.cepa) if filtros.cepa else None
+    origen_l = clave_busqueda(filtros.origen) if filtros.origen else None
+    precio_min = filtros.precio_min
+    precio_max = filtros.precio_max
     filtrados = [
-        v for v in vinos
-        if (not filtros.cepa or filtros.cepa.lower() in v["cepa"].lower())
-        and (not filtros.origen or filtros.origen.lower() in v["origen"].lower())
-        and (not filtros.precio_min or v["precio"] >= filtros.precio_min)
-        and (not filtros.precio_max or v["precio"] <= filtros.precio_max)
+        v for cepa, origen, precio, v in _CATALOG_INDEX
+        if (cepa_l is None or cepa_l in cepa)
+        and (origen_l is None or origen_l in origen)
+        and (precio_min is None or precio >= precio_min)
+        and (precio_max is None or precio <= precio_max)
     ]
-    return Response(data=filtrados, message="Resultados del filtro")
+    return ResponseList(data=filtrados, message="Resultados del filtro")
 
 # ============================================================
 # H-03: Membresía con beneficios
@@ -228,12 +478,12 @@ class MembresiaInput(BaseModel):
     tipo: str  # Silver o Gold
     activa: bool = True
 
-@app.post(f"{API_PREFIX}/membresias/activar", response_model=Response, tags=["Membresías"])
-def activar_membresia(input: MembresiaInput, user: User = Depends(get_current_user)):
-    registro = {"usuario": user.email, "tipo": input.tipo, "activa": input.activa, "fecha": datetime.now()}
+@app.post(f"{API_PREFIX}/membresias/activar", response_model=ResponseDict, tags=["Membresías"])
+async def activar_membresia(input: MembresiaInput, user: User = Depends(get_current_user)):
+    registro = {"usuario": user.email, "tipo": input.tipo, "activa": input.activa, "fecha": ahora()}
     db_membresias.append(registro)
-    print(f"Membresía {input.tipo} activada para {user.email}")
-    return Response(message=f"Membresía {input.tipo} activada correctamente", data=registro)
+    logger.debug("Membresía %s activada para %s", input.tipo, user.email)
+    return ResponseDict(message=f"Membresía {input.tipo} activada correctamente", data=registro)
 
 # ============================================================
 # H-04: Notificaciones personalizadas
@@ -244,33 +494,68 @@ class NotificacionInput(BaseModel):
     horario_inicio: Optional[str] = None
     horario_fin: Optional[str] = None
 
-@app.post(f"{API_PREFIX}/notificaciones/enviar", response_model=Response, tags=["Notificaciones"])
-def enviar_notificacion(input: NotificacionInput, user: User = Depends(get_current_user)):
-    registro = {"usuario": user.email, "canal": input.canal, "mensaje": input.mensaje, "fecha": datetime.now()}
-    db_notificaciones.append(registro)
-    print(f"Notificación enviada a {user.email} por {input.canal}")
-    return Response(message="Notificación procesada", data=registro)
+def _guardar_notificaciones(registros: List[dict]) -> List[dict]:
+    # Punto único para el envío real (email/whatsapp) cuando exista: un lote por llamada
+    db_notificaciones.extend(registros)
+    logger.debug("Lote de %s notificaciones procesado", len(registros))
+    return registros
+
+notif_batcher = MicroBatcher(_guardar_notificaciones)
+
+@app.post(f"{API_PREFIX}/notificaciones/enviar", response_model=ResponseDict, tags=["Notificaciones"])
+async def enviar_notificacion(input: NotificacionInput, user: User = Depends(get_current_user)):
+    registro = {"usuario": user.email, "canal": input.canal, "mensaje": input.mensaje, "fecha": ahora()}
+    registro = await notif_batcher.enviar(registro)
+    return ResponseDict(message="Notificación procesada", data=registro)
 
 # ============================================================
 # H-05: Stock en tiempo real y bloqueo de sobreventa
 # ============================================================
 class ProductoStock(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+    id: UUID = Field(default_factory=_fast_uuid)
     nombre: str
     stock: int
 
-db_stock.append({"nombre": "Cabernet Sauvignon Reserva", "stock": 3})
-
-@app.post(f"{API_PREFIX}/stock/reservar", response_model=Response, tags=["Inventario"])
-def reservar_stock(nombre: str, cantidad: int):
-    for p in db_stock:
-        if p["nombre"].lower() == nombre.lower():
-            if p["stock"] < cantidad:
-                raise HTTPException(status_code=400, detail="Stock insuficiente")
-            p["stock"] -= cantidad
-            print(f"Reservadas {cantidad} unidades de {nombre}")
-            return Response(message=f"{cantidad} unidades reservadas de {nombre}")
-    raise HTTPException(status_code=404, detail="Producto no encontrado")
+# Un lock por producto: reservas del mismo SKU se serializan (sin sobreventa)
+# y las de productos distintos no se bloquean entre sí
+db_stock_locks: Dict[str, asyncio.Lock] = {}
+
+def _agregar_stock(producto: dict) -> None:
+    clave = clave_busqueda(producto["nombre"])
+    db_stock[clave] = producto
+    db_stock_locks[clave] = asyncio.Lock()
+
+_agregar_stock({"nombre": "Cabernet Sauvignon Reserva", "stock": 3})
+
+# Chequeo + descuento atómico en Redis: -1 si no existe, -2 si no alcanza
+_RESERVAR_STOCK_LUA = """
+local actual = redis.call('GET', KEYS[1])
+if not actual then return -1 end
+if tonumber(actual) < tonumber(ARGV[1]) then return -2 end
+return redis.call('DECRBY', KEYS[1], ARGV[1])
+"""
+
+@app.post(f"{API_PREFIX}/stock/reservar", response_model=ResponseDict, tags=["Inventario"])
+async def reservar_stock(nombre: Annotated[str, Query(min_length=1)], cantidad: Annotated[int, Query(gt=0)]):
+    clave = clave_busqueda(nombre)
+    if redis_client is not None:
+        restante = await redis_client.eval(_RESERVAR_STOCK_LUA, 1, f"stock:{clave}", cantidad)
+        if restante == -1:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        if restante == -2:
+            raise HTTPException(status_code=400, detail="Stock insuficiente")
+        logger.debug("Reservadas %s unidades de %s", cantidad, nombre)
+        return ResponseDict(message=f"{cantidad} unidades reservadas de {nombre}")
+
+    p = db_stock.get(clave)
+    if not p:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    async with db_stock_locks[clave]:
+        if p["stock"] < cantidad:
+            raise HTTPException(status_code=400, detail="Stock insuficiente")
+        p["stock"] -= cantidad
+    logger.debug("Reservadas %s unidades de %s", cantidad, nombre)
+    return ResponseDict(message=f"{cantidad} unidades reservadas de {nombre}")
 
 # ============================================================
 # H-06: Seguimiento de pedido y despacho
@@ -282,22 +567,40 @@ class Pedido(BaseModel):
     tracking: Optional[str] = None
 
 db_pedidos: List[Pedido] = []
+db_pedidos_by_id: Dict[int, Pedido] = {}  # clave: pedido.id.int (hash de int, no de UUID)
+ESTADOS_AVANCE = ("Preparando", "Despachado", "En ruta", "Entregado")
+_tracking_pool = _pool(lambda r: f"TRK-{r.randint(1000, 9999)}")
+_avance_pool = _pool(lambda r: r.choice(ESTADOS_AVANCE))
 
 @app.post(f"{API_PREFIX}/pedidos/crear", response_model=Pedido, tags=["Pedidos"])
-def crear_pedido(user: User = Depends(get_current_user)):
-    pedido = Pedido(usuario=user.email, estado="Preparando", tracking=f"TRK-{random.randint(1000,9999)}")
-    db_pedidos.append(pedido)
-    print(f"Pedido {pedido.id} creado para {user.email}")
+async def crear_pedido(user: User = Depends(get_current_user)):
+    pedido = Pedido(usuario=user.email, estado="Preparando", tracking=next(_tracking_pool))
+    if redis_client is not None:
+        await redis_client.hset("pedidos", str(pedido.id), pedido.model_dump_json())
+    else:
+        db_pedidos.append(pedido)
+        db_pedidos_by_id[pedido.id.int] = pedido
+    logger.debug("Pedido %s creado para %s", pedido.id, user.email)
     return pedido
 
-@app.get(f"{API_PREFIX}/pedidos/seguimiento", response_model=Response, tags=["Pedidos"])
-def seguimiento_pedido(pedido_id: UUID):
-    pedido = next((p for p in db_pedidos if p.id == pedido_id), None)
+# /pedidos/{pedido_id} valida el UUID en el path; /pedidos/seguimiento?pedido_id=
+# se mantiene por compatibilidad (y se registra primero para que no la capture
+# la ruta con parámetro)
+@app.get(f"{API_PREFIX}/pedidos/{{pedido_id}}", response_model=ResponseDict, tags=["Pedidos"])
+@app.get(f"{API_PREFIX}/pedidos/seguimiento", response_model=ResponseDict, tags=["Pedidos"])
+async def seguimiento_pedido(pedido_id: UUID):
+    if redis_client is not None:
+        raw = await redis_client.hget("pedidos", str(pedido_id))
+        pedido = Pedido.model_validate_json(raw) if raw else None
+    else:
+        pedido = db_pedidos_by_id.get(pedido_id.int)
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
-    avance = random.choice(["Preparando", "Despachado", "En ruta", "Entregado"])
+    avance = next(_avance_pool)
     pedido.estado = avance
-    return Response(data={"id": pedido.id, "estado": pedido.estado, "tracking": pedido.tracking})
+    if redis_client is not None:
+        await redis_client.hset("pedidos", str(pedido.id), pedido.model_dump_json())
+    return ResponseDict(data={"id": pedido.id, "estado": pedido.estado, "tracking": pedido.tracking})
 
 # ============================================================
 # H-07: Chatbot de maridaje
@@ -305,18 +608,20 @@ def seguimiento_pedido(pedido_id: UUID):
 class ChatbotInput(BaseModel):
     plato: str
 
-@app.post(f"{API_PREFIX}/maridaje/chatbot", response_model=Response, tags=["Maridaje"])
-def chatbot_maridaje(input: ChatbotInput):
-    sugerencias = {
-        "carne": "Cabernet Sauvignon",
-        "pescado": "Sauvignon Blanc",
-        "pasta": "Merlot",
-        "queso": "Carmenere"
-    }
-    plato = input.plato.lower()
-    vino = sugerencias.get(plato, "Pinot Noir")
-    print(f"Sugerencia chatbot para {plato}: {vino}")
-    return Response(message=f"Recomendado para {plato}: {vino}")
+_MARIDAJE_SUGERENCIAS = {
+    "carne": "Cabernet Sauvignon",
+    "pescado": "Sauvignon Blanc",
+    "pasta": "Merlot",
+    "queso": "Carmenere"
+}
+_MARIDAJE_DEFAULT = "Pinot Noir"
+
+@app.post(f"{API_PREFIX}/maridaje/chatbot", response_model=ResponseDict, tags=["Maridaje"])
+async def chatbot_maridaje(input: ChatbotInput):
+    plato = clave_busqueda(input.plato)
+    vino = _MARIDAJE_SUGERENCIAS.get(plato, _MARIDAJE_DEFAULT)
+    logger.debug("Sugerencia chatbot para %s: %s", plato, vino)
+    return ResponseDict(message=f"Recomendado para {plato}: {vino}")
 
 # ============================================================
 # H-08: Atención multicanal y SLA
@@ -327,21 +632,21 @@ class TicketInput(BaseModel):
     mensaje: str
 
 db_tickets: List[dict] = []
+_SLA_POR_CANAL = {"email": "24h", "whatsapp": "5min", "telefono": "10min"}
 
-@app.post(f"{API_PREFIX}/soporte/ticket", response_model=Response, tags=["Atención Cliente"])
-def crear_ticket(input: TicketInput, user: User = Depends(get_current_user)):
-    tiempo = {"email": "24h", "whatsapp": "5min", "telefono": "10min"}
+@app.post(f"{API_PREFIX}/soporte/ticket", response_model=ResponseDict, tags=["Atención Cliente"])
+async def crear_ticket(input: TicketInput, user: User = Depends(get_current_user)):
     registro = {
         "usuario": user.email,
         "canal": input.canal,
         "prioridad": input.prioridad,
         "mensaje": input.mensaje,
-        "SLA": tiempo.get(input.canal, "24h"),
-        "fecha": datetime.now()
+        "SLA": _SLA_POR_CANAL.get(input.canal, "24h"),
+        "fecha": ahora()
     }
     db_tickets.append(registro)
-    print(f"Ticket creado para {user.email} via {input.canal}")
-    return Response(message="Ticket registrado", data=registro)
+    logger.debug("Ticket creado para %s via %s", user.email, input.canal)
+    return ResponseDict(message="Ticket registrado", data=registro)
 
 # ============================================================
 # H-09: Integración con marketplace gourmet
@@ -354,18 +659,25 @@ class MarketplaceSyncInput(BaseModel):
 
 db_marketplace: List[dict] = []
 
-@app.post(f"{API_PREFIX}/marketplace/sincronizar", response_model=Response, tags=["Integraciones"])
-def sincronizar_marketplace(input: MarketplaceSyncInput):
+def _sincronizar_lote_marketplace(registros: List[dict]) -> List[dict]:
+    # Punto único para la llamada a la API del marketplace cuando exista
+    db_marketplace.extend(registros)
+    logger.debug("Marketplace sincronizado: lote de %s productos", len(registros))
+    return registros
+
+marketplace_batcher = MicroBatcher(_sincronizar_lote_marketplace)
+
+@app.post(f"{API_PREFIX}/marketplace/sincronizar", response_model=ResponseDict, tags=["Integraciones"])
+async def sincronizar_marketplace(input: MarketplaceSyncInput):
     registro = {
         "producto": input.producto,
         "stock": input.stock,
         "precio": input.precio,
         "activo": input.activo,
-        "fecha": datetime.now()
+        "fecha": ahora()
     }
-    db_marketplace.append(registro)
-    print(f"Marketplace sincronizado: {input.producto}")
-    return Response(message="Sincronización completada", data=registro)
+    registro = await marketplace_batcher.enviar(registro)
+    return ResponseDict(message="Sincronización completada", data=registro)
 
 # ============================================================
 # H-10: Alianzas con restaurantes
@@ -377,34 +689,38 @@ class AlianzaInput(BaseModel):
 
 db_alianzas: List[dict] = []
 
-@app.post(f"{API_PREFIX}/alianzas/registrar", response_model=Response, tags=["Alianzas"])
-def registrar_alianza(input: AlianzaInput):
+@app.post(f"{API_PREFIX}/alianzas/registrar", response_model=ResponseDict, tags=["Alianzas"])
+async def registrar_alianza(input: AlianzaInput):
     registro = {
         "restaurante": input.restaurante,
         "beneficio": input.beneficio,
         "qr_valido": input.qr_valido,
-        "fecha": datetime.now()
+        "fecha": ahora()
     }
     db_alianzas.append(registro)
-    print(f"Alianza creada con {input.restaurante}")
-    return Response(message="Alianza registrada", data=registro)
+    logger.debug("Alianza creada con %s", input.restaurante)
+    return ResponseDict(message="Alianza registrada", data=registro)
 
 # ============================================================
 # H-11: Dashboard de métricas
 # ============================================================
-@app.get(f"{API_PREFIX}/metricas/dashboard", response_model=Response, tags=["Analítica"])
-def dashboard_metricas():
-    ventas = random.randint(20, 50)
-    ticket_promedio = round(random.uniform(8000, 15000), 2)
-    clientes_nuevos = random.randint(3, 10)
+_ventas_pool = _pool(lambda r: r.randint(20, 50))
+_ticket_pool = _pool(lambda r: round(r.uniform(8000, 15000), 2), 4093)
+_clientes_pool = _pool(lambda r: r.randint(3, 10), 4091)
+
+@app.get(f"{API_PREFIX}/metricas/dashboard", response_model=ResponseDict, tags=["Analítica"])
+async def dashboard_metricas():
+    ventas = next(_ventas_pool)
+    ticket_promedio = next(_ticket_pool)
+    clientes_nuevos = next(_clientes_pool)
     data = {
         "ventas": ventas,
         "ticket_promedio": ticket_promedio,
         "clientes_nuevos": clientes_nuevos,
-        "fecha": datetime.now().strftime("%Y-%m-%d")
+        "fecha": ahora().strftime("%Y-%m-%d")
     }
-    print("Dashboard actualizado con métricas simuladas.")
-    return Response(message="Métricas generadas", data=data)
+    logger.debug("Dashboard actualizado con métricas simuladas.")
+    return ResponseDict(message="Métricas generadas", data=data)
 
 # ============================================================
 # H-12: Predicción de demanda
@@ -413,42 +729,57 @@ class PrediccionInput(BaseModel):
     cepa: str
     mes: str
 
-@app.post(f"{API_PREFIX}/demanda/predecir", response_model=Response, tags=["Analítica"])
-def predecir_demanda(input: PrediccionInput):
-    base = {"Syrah": 120, "Pinot Noir": 90, "Carmenere": 75, "Cabernet": 130}
-    estimacion = base.get(input.cepa, random.randint(50, 100))
-    ajuste = random.uniform(0.9, 1.2)
+_DEMANDA_BASE = {"Syrah": 120, "Pinot Noir": 90, "Carmenere": 75, "Cabernet": 130}
+_demanda_default_pool = _pool(lambda r: r.randint(50, 100))
+_ajuste_pool = _pool(lambda r: r.uniform(0.9, 1.2), 4093)
+
+@app.post(f"{API_PREFIX}/demanda/predecir", response_model=ResponseDict, tags=["Analítica"])
+async def predecir_demanda(input: PrediccionInput):
+    estimacion = _DEMANDA_BASE.get(input.cepa)
+    if estimacion is None:
+        estimacion = next(_demanda_default_pool)
+    ajuste = next(_ajuste_pool)
     demanda = round(estimacion * ajuste)
-    print(f"Predicción: {input.cepa} en {input.mes} → {demanda} botellas estimadas")
-    return Response(message="Predicción de demanda generada",
-                    data={"cepa": input.cepa, "mes": input.mes, "estimado": demanda})
+    logger.debug("Predicción: %s en %s → %s botellas estimadas", input.cepa, input.mes, demanda)
+    return ResponseDict(message="Predicción de demanda generada",
+                        data={"cepa": input.cepa, "mes": input.mes, "estimado": demanda})
 
 # ============================================================
 # H-13: Etiqueta digital con huella de carbono
 # ============================================================
 class EtiquetaDigital(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+    model_config = ConfigDict(frozen=True)
+    id: UUID = Field(default_factory=_fast_uuid)
     vino: str
     huella_carbono: float
     certificaciones: List[str]
     vigente: bool = True
 
 db_etiquetas: List[EtiquetaDigital] = []
-
-@app.post(f"{API_PREFIX}/etiquetas/registrar", response_model=Response, tags=["Sostenibilidad"])
-def registrar_etiqueta(input: EtiquetaDigital):
-    db_etiquetas.append(input)
-    print(f"Etiqueta digital registrada para {input.vino}")
-    return Response(message="Etiqueta registrada", data=input.dict())
-
-@app.get(f"{API_PREFIX}/etiquetas/ver", response_model=Response, tags=["Sostenibilidad"])
-def ver_etiqueta(vino: str):
-    etiqueta = next((e for e in db_etiquetas if e.vino.lower() == vino.lower()), None)
+db_etiquetas_by_vino: Dict[str, EtiquetaDigital] = {}  # clave: clave_busqueda(vino)
+
+@app.post(f"{API_PREFIX}/etiquetas/registrar", response_model=ResponseDict, tags=["Sostenibilidad"])
+async def registrar_etiqueta(input: EtiquetaDigital):
+    if redis_client is not None:
+        await _redis_registrar_por_vino("etiquetas", input.vino, input.model_dump_json())
+    else:
+        db_etiquetas.append(input)
+        db_etiquetas_by_vino.setdefault(sys.intern(clave_busqueda(input.vino)), input)
+    logger.debug("Etiqueta digital registrada para %s", input.vino)
+    return ResponseDict(message="Etiqueta registrada", data=input.model_dump(mode="json"))
+
+@app.get(f"{API_PREFIX}/etiquetas/ver", response_model=ResponseDict, tags=["Sostenibilidad"])
+async def ver_etiqueta(vino: Annotated[str, Query(min_length=1)]):
+    if redis_client is not None:
+        raw = await redis_client.hget("etiquetas:by_vino", clave_busqueda(vino))
+        etiqueta = EtiquetaDigital.model_validate_json(raw) if raw else None
+    else:
+        etiqueta = db_etiquetas_by_vino.get(clave_busqueda(vino))
     if not etiqueta:
         raise HTTPException(status_code=404, detail="Etiqueta no encontrada")
     if not etiqueta.vigente:
-        return Response(message="Etiqueta expirada", data=etiqueta.dict())
-    return Response(message="Etiqueta encontrada", data=etiqueta.dict())
+        return ResponseDict(message="Etiqueta expirada", data=etiqueta.model_dump(mode="json"))
+    return ResponseDict(message="Etiqueta encontrada", data=etiqueta.model_dump(mode="json"))
 
 # ============================================================
 # H-14: Campañas de donación responsable
@@ -460,66 +791,110 @@ class DonacionInput(BaseModel):
 
 db_donaciones: List[dict] = []
 
-@app.post(f"{API_PREFIX}/donaciones/aportar", response_model=Response, tags=["Responsabilidad Social"])
-def registrar_donacion(input: DonacionInput, user: User = Depends(get_current_user)):
+@app.post(f"{API_PREFIX}/donaciones/aportar", response_model=ResponseDict, tags=["Responsabilidad Social"])
+async def registrar_donacion(input: DonacionInput, user: User = Depends(get_current_user)):
     aporte = round(input.monto_compra * input.porcentaje, 2)
     registro = {
         "usuario": user.email,
         "ong": input.ong,
         "aporte": aporte,
-        "fecha": datetime.now()
+        "fecha": ahora()
     }
     db_donaciones.append(registro)
-    print(f"{user.email} aportó ${aporte} a {input.ong}")
-    return Response(message="Donación registrada", data=registro)
+    logger.debug("%s aportó $%s a %s", user.email, aporte, input.ong)
+    return ResponseDict(message="Donación registrada", data=registro)
 
 # ============================================================
 # H-15: Visitas virtuales a viñedos (AR/VR)
 # ============================================================
 class VisitaVirtual(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+    model_config = ConfigDict(frozen=True)
+    id: UUID = Field(default_factory=_fast_uuid)
     bodega: str
     url_experiencia: str
     duracion_min: int
     compatible_webar: bool = True
 
 db_visitas: List[VisitaVirtual] = []
-
-@app.post(f"{API_PREFIX}/visitas/registrar", response_model=Response, tags=["Experiencias"])
-def registrar_visita(input: VisitaVirtual):
-    db_visitas.append(input)
-    print(f"Visita virtual registrada: {input.bodega}")
-    return Response(message="Visita registrada", data=input.dict())
-
-@app.get(f"{API_PREFIX}/visitas/listar", response_model=Response, tags=["Experiencias"])
-def listar_visitas():
-    return Response(message="Listado de experiencias virtuales", data=[v.dict() for v in db_visitas])
+# JSON ya armado de listar_visitas junto a cuántas visitas contiene. Las
+# visitas solo se agregan: si el total (local o LLEN en Redis) no cambió, el
+# JSON sigue vigente, también cuando otro worker es el que registró
+_visitas_cache: Optional[Tuple[int, bytes]] = None
+
+@app.post(f"{API_PREFIX}/visitas/registrar", response_model=ResponseDict, tags=["Experiencias"])
+async def registrar_visita(input: VisitaVirtual):
+    if redis_client is not None:
+        await redis_client.rpush("visitas", input.model_dump_json())
+    else:
+        db_visitas.append(input)
+    logger.debug("Visita virtual registrada: %s", input.bodega)
+    return ResponseDict(message="Visita registrada", data=input.model_dump(mode="json"))
+
+@app.get(f"{API_PREFIX}/visitas/listar", response_model=ResponseList, tags=["Experiencias"])
+async def listar_visitas():
+    global _visitas_cache
+    total = await redis_client.llen("visitas") if redis_client is not None else len(db_visitas)
+    if _visitas_cache is None or _visitas_cache[0] != total:
+        if redis_client is not None:
+            data = [orjson.loads(raw) for raw in await redis_client.lrange("visitas", 0, total - 1)]
+        else:
+            data = [v.model_dump(mode="json") for v in db_visitas]
+        _visitas_cache = (total, orjson.dumps({
+            "statusCode": 200,
+            "message": "Listado de experiencias virtuales",
+            "data": data,
+        }))
+    return RawResponse(content=_visitas_cache[1], media_type="application/json")
 
 # ============================================================
 # H-16: Maridajes interactivos en etiqueta
 # ============================================================
 class MaridajeInteractivo(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+    model_config = ConfigDict(frozen=True)
+    id: UUID = Field(default_factory=_fast_uuid)
     vino: str
     sugerencias: List[str]
     disponible_offline: bool = False
 
 db_maridajes: List[MaridajeInteractivo] = []
-
-@app.post(f"{API_PREFIX}/maridajes/registrar", response_model=Response, tags=["Maridajes"])
-def registrar_maridaje(input: MaridajeInteractivo):
-    db_maridajes.append(input)
-    print(f"Maridaje interactivo registrado para {input.vino}")
-    return Response(message="Maridaje registrado", data=input.dict())
-
-@app.get(f"{API_PREFIX}/maridajes/ver", response_model=Response, tags=["Maridajes"])
-def ver_maridaje(vino: str):
-    maridaje = next((m for m in db_maridajes if m.vino.lower() == vino.lower()), None)
+db_maridajes_by_vino: Dict[str, MaridajeInteractivo] = {}  # clave: clave_busqueda(vino)
+
+@app.post(f"{API_PREFIX}/maridajes/registrar", response_model=ResponseDict, tags=["Maridajes"])
+async def registrar_maridaje(input: MaridajeInteractivo):
+    if redis_client is not None:
+        await _redis_registrar_por_vino("maridajes", input.vino, input.model_dump_json())
+    else:
+        db_maridajes.append(input)
+        db_maridajes_by_vino.setdefault(sys.intern(clave_busqueda(input.vino)), input)
+    logger.debug("Maridaje interactivo registrado para %s", input.vino)
+    return ResponseDict(message="Maridaje registrado", data=input.model_dump(mode="json"))
+
+@app.get(f"{API_PREFIX}/maridajes/ver", response_model=ResponseDict, tags=["Maridajes"])
+async def ver_maridaje(vino: Annotated[str, Query(min_length=1)]):
+    if redis_client is not None:
+        raw = await redis_client.hget("maridajes:by_vino", clave_busqueda(vino))
+        maridaje = MaridajeInteractivo.model_validate_json(raw) if raw else None
+    else:
+        maridaje = db_maridajes_by_vino.get(clave_busqueda(vino))
     if not maridaje:
         raise HTTPException(status_code=404, detail="Maridaje no encontrado")
-    return Response(message="Maridaje encontrado", data=maridaje.dict())
+    return ResponseDict(message="Maridaje encontrado", data=maridaje.model_dump(mode="json"))
 
 # ============================================================
 # FIN DEL ARCHIVO
 # ============================================================
 print("API Viña Urbana lista. Ejecuta: uvicorn main_vinaurbana:app --reload")
+
+if __name__ == "__main__":
+    # python main_vinaurbana.py -> event loop uvloop + parser HTTP httptools
+    # (pip install uvloop httptools). uvloop no existe en Windows: ahí asyncio.
+    # Sin Redis, un solo worker: las "bases de datos" viven en la memoria del
+    # proceso. Con VINAURBANA_REDIS_URL, VINAURBANA_WORKERS fija cuántos.
+    import uvicorn
+
+    uvicorn.run(
+        "main_vinaurbana:app",
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.environ.get("VINAURBANA_WORKERS", "1")) if REDIS_URL else 1,
+    )
@@ -7,6 +7,7 @@ from uuid import UUID, uuid4
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import hashlib
+import hmac
 import random
 API_PREFIX = "/api/vinaurbana"
 
@@ -84,7 +85,7 @@ def hashear_contraseña(password: str) -> str:
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
 def verificar_contraseña(plain: str, hashed: str) -> bool:
-    return hashear_contraseña(plain) == hashed
+    return hmac.compare_digest(hashear_contraseña(plain), hashed)
 
 
 def crear_token(data: dict) -> str: